@@ -1,5 +1,7 @@
+import asyncio
 import hashlib
 import json
+import logging
 import time
 
 import aiohttp
@@ -8,6 +10,21 @@ from astrbot.api import logger
 
 from .config import PluginConfig
 
+# 日志中单个响应的最大字符数
+LOG_MAX_CHARS = 500
+
+
+def _dumps(obj) -> str:
+    """紧凑 JSON 序列化，签名与请求体依赖其输出，须保持稳定"""
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _truncate(obj, limit: int = LOG_MAX_CHARS) -> str:
+    text = str(obj)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(共 {len(text)} 字符)"
+
 
 class AfdianAPIClient:
     def __init__(self, config: PluginConfig):
@@ -18,21 +35,31 @@ class AfdianAPIClient:
         """
         self.cfg = config.api
         self.session = aiohttp.ClientSession()
+        # (token, 已写入 token 前缀的 md5 状态)
+        self._sign_cache = None
 
     async def close(self):
         await self.session.close()
 
-    def _generate_sign(self, params: dict, ts: int) -> str:
+    def _sign_prefix(self):
+        """返回已写入 token 前缀的 md5 状态，token 变更时重建"""
+        token = self.cfg.token
+        cache = self._sign_cache
+        if cache is None or cache[0] != token:
+            cache = (token, hashlib.md5(f"{token}params".encode("utf-8")))
+            self._sign_cache = cache
+        return cache[1]
+
+    def _generate_sign(self, params_str: str, ts: int) -> str:
         """
         生成请求签名 sign
-        :param params: 请求参数 dict
+        :param params_str: 已序列化的请求参数
         :param ts: 秒级时间戳
         :return: MD5 签名字符串
         """
-        params_str = json.dumps(params, separators=(",", ":"))
-        kv_string = f"params{params_str}ts{ts}user_id{self.cfg.user_id}"
-        sign_raw = self.cfg.token + kv_string
-        return hashlib.md5(sign_raw.encode("utf-8")).hexdigest()
+        md5 = self._sign_prefix().copy()
+        md5.update(f"{params_str}ts{ts}user_id{self.cfg.user_id}".encode("utf-8"))
+        return md5.hexdigest()
 
     async def _post(self, endpoint: str, params: dict) -> dict:
         """
@@ -42,44 +69,100 @@ class AfdianAPIClient:
         :return: 响应 dict
         """
         ts = int(time.time())
-        sign = self._generate_sign(params, ts)
+        # 参数只序列化一次，签名与请求体共用同一字符串
+        params_str = _dumps(params)
         payload = {
             "user_id": self.cfg.user_id,
-            "params": json.dumps(params, separators=(",", ":")),
+            "params": params_str,
             "ts": ts,
-            "sign": sign,
+            "sign": self._generate_sign(params_str, ts),
         }
 
         url = self.cfg.base_url + endpoint
         try:
-            async with self.session.post(url, json=payload, timeout=10) as resp: # type: ignore
+            async with self.session.post(
+                url,
+                data=_dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=10,  # type: ignore
+            ) as resp:
                 resp.raise_for_status()
                 return await resp.json()
         except aiohttp.ClientError as e:
             logger.error(f"[Afdian] 请求失败: {e}")
             return {"ec": -1, "em": str(e)}
+        except asyncio.TimeoutError:
+            logger.error(f"[Afdian] 请求超时: {endpoint}")
+            return {"ec": -1, "em": "timeout"}
 
     async def ping(self) -> dict:
         """测试接口连通性及签名是否正确"""
         return await self._post("/ping", {"a": 114514})
 
+    async def _query_order_page(
+        self, page: int, out_trade_no: str, per_page: int
+    ) -> dict:
+        """请求单页订单并记录摘要日志，返回原始响应"""
+        params: dict = {"page": page, "per_page": per_page}
+        if out_trade_no:
+            params["out_trade_no"] = out_trade_no
+        res = await self._post("/query-order", params)
+        logger.info(
+            f"[Afdian] 查询订单 {_truncate(out_trade_no, 100)} 结果: "
+            f"ec={res.get('ec')} em={res.get('em')} "
+            f"共 {len(res.get('data', {}).get('list', []))} 条"
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[Afdian] 查询订单响应: {_truncate(res)}")
+        return res
+
     async def query_order(
-        self, page: int = 1, out_trade_no: str = "", per_page: int = 50
+        self, page: int = 1, out_trade_no: str | list[str] = "", per_page: int = 50
     ) -> list[dict]:
         """
         查询订单列表
         :param page: 页码
-        :param out_trade_no: 指定订单号（可多个，用英文逗号分隔）
+        :param out_trade_no: 指定订单号（英文逗号分隔）；传入列表时按每批 100 个并发查询，忽略分页参数
         :param per_page: 每页数量（默认50，最大100）
         :return: 订单信息列表
         """
-        params: dict = {"page": page, "per_page": per_page}
-        if out_trade_no:
-            params["out_trade_no"] = out_trade_no
-        res = await self._post("/query-order", params)
-        logger.info(f"[Afdian] 查询订单 {out_trade_no} 结果: {res}")
+        if isinstance(out_trade_no, list):
+            orders, _ = await self.query_orders_by_ids(out_trade_no)
+            return orders
+        res = await self._query_order_page(page, out_trade_no, per_page)
         return res.get("data", {}).get("list", [])
 
+    async def query_orders_by_ids(
+        self, out_trade_nos: list[str], batch_size: int = 100
+    ) -> tuple[list[dict], list[str]]:
+        """
+        按订单号批量查询，每批最多 100 个，各批并发请求
+        :param out_trade_nos: 订单号列表
+        :param batch_size: 每批订单号数量（最大100）
+        :return: (订单信息列表, 查询失败的订单号列表)
+        """
+        batches = [
+            out_trade_nos[i : i + batch_size]
+            for i in range(0, len(out_trade_nos), batch_size)
+        ]
+        results = await asyncio.gather(
+            *(
+                self._query_order_page(1, ",".join(batch), len(batch))
+                for batch in batches
+            ),
+            return_exceptions=True,
+        )
+
+        orders: list[dict] = []
+        failed: list[str] = []
+        for batch, res in zip(batches, results):
+            if isinstance(res, BaseException) or res.get("ec") != 200:
+                logger.error(f"[Afdian] 批量查询订单失败({len(batch)} 个): {res}")
+                failed.extend(batch)
+                continue
+            orders.extend(res.get("data", {}).get("list", []))
+        return orders, failed
+
     async def query_sponsor(
         self, page: int = 1, sponsor_user_ids: str = "", per_page: int = 20
     ) -> dict:
@@ -92,8 +175,15 @@ class AfdianAPIClient:
         """
         params: dict = {"page": page, "user_id": sponsor_user_ids, "per_page": per_page}
         sponsors = await self._post("/query-sponsor", params)
-        logger.info(f"[Afdian] 查询赞助者({sponsor_user_ids}) 结果: {sponsors}")
-        return sponsors.get("data", {})
+        data = sponsors.get("data", {})
+        logger.info(
+            f"[Afdian] 查询赞助者({_truncate(sponsor_user_ids, 100)}) 结果: "
+            f"ec={sponsors.get('ec')} em={sponsors.get('em')} "
+            f"共 {len(data.get('list', []))} 条"
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[Afdian] 查询赞助者响应: {_truncate(sponsors)}")
+        return data
 
 
     def generate_payment_url(self, price: float, remark: str):
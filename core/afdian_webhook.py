@@ -14,16 +14,23 @@ class AfdianWebhookServer:
     def __init__(self, config: PluginConfig, db: OrderDB):
         self.cfg = config.webhook
         self.db = db
+        self.pending_path = config.pending_path
         self._order_callback = None
         self.app = web.Application()
         self.runner = None
         self.site = None
         self._started = False
-        self._callback_tasks = set()
+        self._draining = False
+        self._inflight_requests: set[asyncio.Task] = set()
+        # task -> order，用于关闭时保存未完成的回调
+        self._callback_tasks: dict[asyncio.Task, dict] = {}
+        # 订单推送订阅者队列，None 表示通知订阅者断开
+        self._subscribers: set[asyncio.Queue[dict | None]] = set()
         self.app.add_routes(
             [
                 web.post("/", self.receive_webhook),
                 web.get("/orders", self.list_orders),
+                web.get("/orders/stream", self.stream_orders),
             ]
         )
 
@@ -35,7 +42,120 @@ class AfdianWebhookServer:
         orders = self.db.get_all_orders()
         return web.json_response(orders)
 
+    @staticmethod
+    def _order_cursor(order: dict) -> str:
+        return f"{int(order.get('create_time') or 0)}:{order.get('out_trade_no') or ''}"
+
+    async def _send_event(self, resp: web.StreamResponse, order: dict) -> None:
+        data = json.dumps(order, ensure_ascii=False)
+        event = f"id: {self._order_cursor(order)}\nevent: order\ndata: {data}\n\n"
+        await resp.write(event.encode("utf-8"))
+
+    def _close_subscriber(self, queue: asyncio.Queue) -> None:
+        """清空积压并放入断开信号"""
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def _publish_order(self, order: dict) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(order)
+            except asyncio.QueueFull:
+                logger.warning("订单推送订阅者积压过多，已断开，客户端可带游标重连")
+                self._close_subscriber(queue)
+
+    async def stream_orders(self, request: web.Request):
+        """以 SSE 推送订单，支持通过 cursor 参数或 Last-Event-ID 断点续传"""
+        if self._draining:
+            return web.json_response(
+                {"ec": 503, "em": "server draining"}, status=503
+            )
+
+        cursor = request.query.get("cursor") or request.headers.get("Last-Event-ID")
+        after = None
+        if cursor:
+            create_time, _, out_trade_no = cursor.partition(":")
+            try:
+                after = (int(create_time), out_trade_no)
+            except ValueError:
+                return web.json_response(
+                    {"ec": 400, "em": "invalid cursor"}, status=400
+                )
+
+        resp = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await resp.prepare(request)
+
+        # 先订阅再补发历史，避免补发期间漏掉新订单
+        queue: asyncio.Queue[dict | None] = asyncio.Queue(
+            maxsize=max(int(self.cfg.stream_queue_size or 0), 1)
+        )
+        self._subscribers.add(queue)
+        # 补发期间入队、尚未确认是否已补发过的订单
+        pending: list[dict] = []
+        closed = False
+        try:
+            while after is not None and not self._draining and not closed:
+                rows = self.db.get_orders_after(*after)
+                # 只保留本页内容用于去重，内存不随补发量增长
+                sent: dict[str, dict] = {}
+                for row in rows:
+                    order = self.db.row_to_order(row)
+                    await self._send_event(resp, order)
+                    sent[order["out_trade_no"]] = order
+                    after = (order["create_time"], order["out_trade_no"])
+                if not rows:
+                    after = None
+
+                while not queue.empty():
+                    item = queue.get_nowait()
+                    if item is None:
+                        closed = True
+                        break
+                    pending.append(item)
+                # 同一订单只保留最新一次推送
+                latest = {o["out_trade_no"]: o for o in pending}
+                pending = []
+                for order in latest.values():
+                    key = (order["create_time"], order["out_trade_no"])
+                    if after is not None and key > after:
+                        # 游标之后的订单留待后续页补发时比对
+                        pending.append(order)
+                    elif sent.get(order["out_trade_no"]) != order:
+                        # 与补发内容不同，说明是补发读取之后的更新
+                        await self._send_event(resp, order)
+                if len(pending) > queue.maxsize:
+                    logger.warning("订单推送订阅者补发期间积压过多，已断开，客户端可带游标重连")
+                    closed = True
+
+            while not self._draining and not closed:
+                try:
+                    order = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    await resp.write(b": ping\n\n")
+                    continue
+                if order is None:
+                    break
+                await self._send_event(resp, order)
+        except ConnectionResetError:
+            pass
+        finally:
+            self._subscribers.discard(queue)
+        return resp
+
     async def receive_webhook(self, request: web.Request):
+        if self._draining:
+            logger.warning("Webhook 正在关闭，拒绝新的订单通知")
+            return web.json_response(
+                {"ec": 503, "em": "server draining"}, status=503
+            )
+
+        current = asyncio.current_task()
+        if current:
+            self._inflight_requests.add(current)
         try:
             data = await request.json()
             logger.info(f"收到爱发电订单通知：{json.dumps(data, ensure_ascii=False)}")
@@ -52,10 +172,18 @@ class AfdianWebhookServer:
         except Exception as e:
             logger.error(f"处理通知失败: {e}")
             return web.json_response({"ec": 500, "em": "server error"}, status=500)
+        finally:
+            if current:
+                self._inflight_requests.discard(current)
 
     async def handle_order(self, order: dict):
         self.db.save_order(order)  # type: ignore
         logger.info(f"订单保存成功：{order.get('out_trade_no')}")
+        if self._subscribers:
+            # 推送入库后的订单，与断点续传补发的数据格式保持一致
+            row = self.db.get_order_by_id(order.get("out_trade_no") or "")
+            if row:
+                self._publish_order(self.db.row_to_order(row))
 
         if self._order_callback:
             if callable(self._order_callback):
@@ -63,19 +191,85 @@ class AfdianWebhookServer:
                     res = self._order_callback(order)
                     if hasattr(res, "__await__"):
                         task = asyncio.create_task(res)  # type: ignore
-                        self._callback_tasks.add(task)
+                        self._callback_tasks[task] = order
 
                         def on_callback_done(task: asyncio.Task) -> None:
-                            self._callback_tasks.discard(task)
+                            self._callback_tasks.pop(task, None)
                             try:
                                 task.result()
                             except asyncio.CancelledError:
                                 pass
                             except Exception as e:
-                                logger.error(f"订单回调处理失败: {e}")
+                                # 回调失败的订单落盘，下次启动时重放
+                                logger.error(f"订单回调处理失败，已保存待重放: {e}")
+                                self._save_pending([order])
 
                         task.add_done_callback(on_callback_done)
 
+    async def _drain(self) -> None:
+        """等待进行中的请求与订单回调完成，超时未完成的回调订单落盘待重放"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(float(self.cfg.drain_timeout or 0), 0)
+        while True:
+            pending = self._inflight_requests | set(self._callback_tasks)
+            remaining = deadline - loop.time()
+            if not pending or remaining <= 0:
+                break
+            await asyncio.wait(pending, timeout=remaining)
+
+        if self._inflight_requests:
+            # 中断超时的通知请求，确保不会在关闭清理期间返回 200
+            inflight = list(self._inflight_requests)
+            for task in inflight:
+                task.cancel()
+            await asyncio.gather(*inflight, return_exceptions=True)
+            logger.warning(
+                f"已中断 {len(inflight)} 个未处理完成的订单通知，将由爱发电重新推送"
+            )
+
+        leftover = list(self._callback_tasks.values())
+        for task in self._callback_tasks:
+            task.cancel()
+        self._callback_tasks.clear()
+        if leftover:
+            self._save_pending(leftover)
+            logger.warning(f"{len(leftover)} 个订单回调未完成，已保存，下次启动时重放")
+
+    def _load_pending(self) -> list[dict]:
+        if not self.pending_path.exists():
+            return []
+        try:
+            with self.pending_path.open(encoding="utf-8") as f:
+                orders = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"读取待重放订单失败: {e}")
+            return []
+        return orders if isinstance(orders, list) else []
+
+    def _save_pending(self, orders: list[dict]) -> None:
+        orders = self._load_pending() + orders
+        try:
+            self.pending_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.pending_path.open("w", encoding="utf-8") as f:
+                json.dump(orders, f, ensure_ascii=False)
+        except OSError as e:
+            logger.error(f"保存待重放订单失败: {e}")
+
+    async def _replay_pending(self) -> None:
+        """重放上次关闭时未完成回调的订单"""
+        orders = self._load_pending()
+        if not orders:
+            return
+        # 先移除文件，重放中回调失败或关闭时未完成的订单会重新写回
+        self.pending_path.unlink(missing_ok=True)
+        logger.info(f"重放 {len(orders)} 个上次未完成的订单回调")
+        for order in orders:
+            try:
+                await self.handle_order(order)
+            except Exception as e:
+                logger.error(f"重放订单失败 {order.get('out_trade_no')}: {e}")
+                self._save_pending([order])
+
     async def start(self) -> bool:
         """Start the aiohttp webhook service.
 
@@ -93,7 +287,13 @@ class AfdianWebhookServer:
         if self.runner or self.site:
             await self.stop()
 
-        self.runner = web.AppRunner(self.app)
+        self._draining = False
+        await self._replay_pending()
+
+        # 超时请求已在 _drain 中中断，清理阶段的等待同样以 drain_timeout 为上限
+        self.runner = web.AppRunner(
+            self.app, shutdown_timeout=max(float(self.cfg.drain_timeout or 0), 0)
+        )
         try:
             await self.runner.setup()
             self.site = web.TCPSite(self.runner, host=self.cfg.host, port=self.cfg.port)
@@ -124,14 +324,20 @@ class AfdianWebhookServer:
         return True
 
     async def stop(self):
-        """Stop the aiohttp webhook service."""
+        """Stop the aiohttp webhook service.
+
+        New webhooks are rejected first, then in-flight requests and order
+        callbacks are given ``drain_timeout`` seconds to finish. Callbacks that
+        are still pending afterwards are persisted and replayed on ``start``.
+        """
+        self._draining = True
+        for queue in list(self._subscribers):
+            self._close_subscriber(queue)
+        await self._drain()
         if self.site:
             await self.site.stop()
         if self.runner:
             await self.runner.cleanup()
-        for task in self._callback_tasks:
-            task.cancel()
-        self._callback_tasks.clear()
         self.runner = None
         self.site = None
         self._started = False
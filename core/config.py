@@ -90,6 +90,8 @@ class ConfigNode:
 class WebhookConfig(ConfigNode):
     host: str
     port: int
+    drain_timeout: float
+    stream_queue_size: int
 
 class ApiConfig(ConfigNode):
     base_url: str
@@ -115,6 +117,7 @@ class PluginConfig(ConfigNode):
 
         self.data_dir = Path(get_astrbot_plugin_data_path()) / self._plugin_name
         self.db_path = self.data_dir / "orders.db"
+        self.pending_path = self.data_dir / "pending_orders.json"
 
     def add_notice_session(self, session_id: str) -> None:
         if session_id not in self.notice_sessions:
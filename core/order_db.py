@@ -123,6 +123,22 @@ class OrderDB:
             )
             return cursor.fetchone()
 
+    def get_orders_by_ids(self, out_trade_nos: list[str]) -> list[sqlite3.Row]:
+        rows: list[sqlite3.Row] = []
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            # 分块查询，避免超出 SQLite 参数数量上限
+            for i in range(0, len(out_trade_nos), 500):
+                chunk = out_trade_nos[i : i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT * FROM afdian_orders WHERE out_trade_no IN ({placeholders})",
+                    chunk,
+                )
+                rows.extend(cursor.fetchall())
+        return rows
+
     def get_orders_by_user(self, user_id: str) -> list[sqlite3.Row]:
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
@@ -143,6 +159,34 @@ class OrderDB:
             )
             return cursor.fetchall()
 
+    def get_orders_after(
+        self, create_time: int, out_trade_no: str = "", limit: int = 500
+    ) -> list[sqlite3.Row]:
+        """按 (create_time, out_trade_no) 升序获取游标之后的订单"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT * FROM afdian_orders
+                WHERE create_time > ? OR (create_time = ? AND out_trade_no > ?)
+                ORDER BY create_time ASC, out_trade_no ASC
+                LIMIT ?
+                """,
+                (create_time, create_time, out_trade_no, limit),
+            )
+            return cursor.fetchall()
+
+    @staticmethod
+    def row_to_order(row: sqlite3.Row) -> dict:
+        """将数据库行还原为与爱发电接口一致的订单 dict"""
+        order = dict(row)
+        try:
+            order["sku_detail"] = json.loads(order.get("sku_detail") or "[]")
+        except ValueError:
+            order["sku_detail"] = []
+        return order
+
     @staticmethod
     def _safe_float(value: str | float | int | Decimal | None) -> float:
         try:
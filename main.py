@@ -29,8 +29,9 @@ class AfdianPlugin(Star):
         self.bots = []
 
     async def initialize(self):
-        await self.server.start()
+        # 先注册回调，启动时重放的订单才能正常通知
         self.server.register_order_callback(self.on_new_order)
+        await self.server.start()
 
     async def terminate(self):
         await self.server.stop()
@@ -88,15 +89,41 @@ class AfdianPlugin(Star):
 
     @filter.permission_type(filter.PermissionType.ADMIN)
     @filter.command("查询订单")
-    async def query_order(self, event: AstrMessageEvent, out_trade_no: str):
-        """查询订单"""
-        orders = await self.client.query_order(out_trade_no=out_trade_no)
-        if not orders:
+    async def query_order(self, event: AstrMessageEvent):
+        """查询订单 <订单号...> -可一次查询多个订单（空格或英文逗号分隔）"""
+        args = event.message_str.replace(",", " ").split()[1:]
+        out_trade_nos = list(dict.fromkeys(args))
+        if not out_trade_nos:
+            yield event.plain_result("请提供订单号")
+            return
+
+        # 优先从本地数据库读取，仅远程查询缺失的订单
+        found = {
+            row["out_trade_no"]: self.db.row_to_order(row)
+            for row in self.db.get_orders_by_ids(out_trade_nos)
+        }
+        missing = [no for no in out_trade_nos if no not in found]
+        failed: list[str] = []
+        if missing:
+            orders, failed = await self.client.query_orders_by_ids(missing)
+            for order in orders:
+                # 远程查到的多为历史订单，只入库，不推送到订单流
+                self.db.save_order(order)  # type: ignore
+                found[order.get("out_trade_no", "")] = order
+
+        if not found and not failed:
             yield event.plain_result("未找到该订单")
             return
-        for order in orders:
-            image = await self.text_to_image(text=parse_order(order))
-            yield event.image_result(image)
+        sections = [parse_order(found[no]) for no in out_trade_nos if no in found]
+        not_found = [
+            no for no in out_trade_nos if no not in found and no not in failed
+        ]
+        if failed:
+            sections.append("⚠️ 查询失败：\n" + "\n".join(failed))
+        if not_found:
+            sections.append("❓ 未找到订单：\n" + "\n".join(not_found))
+        image = await self.text_to_image(text="\n\n".join(sections))
+        yield event.image_result(image)
 
     @filter.permission_type(filter.PermissionType.ADMIN)
     @filter.command("查询发电", alias={"查询赞助"})